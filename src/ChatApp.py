@@ -45,10 +45,15 @@ class InvalidArgException(Exception):
     pass
 
 
+# compiled once at import instead of per valid_ip call
+IPV4_PATTERN = re.compile(
+    "^(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
+)
+
+
 def valid_ip(value):
     """Validate an IP address arg text is valid IPv4."""
-    ipv4_pattern = "^(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$"
-    if re.match(ipv4_pattern, value):
+    if IPV4_PATTERN.match(value):
         return value
     else:
         raise InvalidArgException("Use only IPv4 addressing")
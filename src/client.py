@@ -1,33 +1,33 @@
-import re
-import time
 import socket
-import json
 from threading import Thread, Event
 import signal
-import select
-from functools import wraps
-
-from log import logger
 
+import wire
+from wire import dumps as _dumps, loads as _loads
 
-def handles_retries(method):
-    @wraps(method)
-    def wrapper(self, *args, **kwargs):
-        retries = 0
-        self.waiting_for_ack = True
-        while self.waiting_for_ack and retries <= 5:
-            method(self, *args, **kwargs)
-            # We don't want to sleep on the 5th time we just exit
-            if retries <= 4:
-                time.sleep(self.delay)
-            retries += 1
-
-        if self.waiting_for_ack:
-            self.exit_server_not_respond()
-
-        return
-
-    return wrapper
+from log import logger
+from mt import MT
+
+# 12MiB kernel buffers to absorb broadcast bursts without drops
+SOCK_BUF_SIZE = 12 * 1024 * 1024
+# Loopback datagram used to unblock the listener's recvfrom on shutdown
+WAKE_SENTINEL = b"\x00"
+# Lets the listener drain buffered packets without blocking (0 on e.g. Windows)
+MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+# Latency knobs applied best-effort per option (Linux numbers used as
+# fallback where the socket module doesn't export the name):
+# pin DF so our small packets never risk fragmentation handling, bump
+# queueing priority, and let recv busy-poll the NIC for 50us before sleeping
+LATENCY_SOCKOPTS = (
+    (
+        socket.IPPROTO_IP,
+        getattr(socket, "IP_MTU_DISCOVER", 10),
+        getattr(socket, "IP_PMTUDISC_DO", 2),
+    ),
+    (socket.SOL_SOCKET, getattr(socket, "SO_PRIORITY", 12), 6),
+    (socket.SOL_SOCKET, getattr(socket, "SO_BUSY_POLL", 46), 50),
+)
 
 
 class ClientError(Exception):
@@ -36,6 +36,22 @@ class ClientError(Exception):
     pass
 
 
+def _local_ip():
+    """Returns the IPv4 addr other hosts reach us at, without DNS.
+
+    gethostbyname(gethostname()) does a resolver lookup (slow, and wrong on
+    machines whose hostname maps to 127.0.1.1). Connecting a UDP socket sends
+    no packets but makes the kernel pick the outbound interface, whose addr
+    getsockname then reports.
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(("8.8.8.8", 80))
+            return sock.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+
+
 class Client:
     def __init__(self, opts):
         """{name,server_ip,server_port,client_port}"""
@@ -45,14 +61,57 @@ class Client:
         self.delay = 500 / 1000  # 500ms
         self.active_group = None
         self.waiting_for_ack = False
+        self._ack_event = Event()
         self.inbox = []
-        self.client_ip = socket.gethostbyname(socket.gethostname())
+        self.client_ip = _local_ip()
+        # resolved once; every server-bound send reuses the same tuple
+        self._server_addr = (opts["server_ip"], opts["server_port"])
+        # Metadata never changes after startup, so serialize it once and
+        # splice the bytes into every outgoing packet instead of re-encoding.
+        # (fragment splicing only works when the wire format is JSON)
+        self._metadata = {**self.opts, "client_ip": self.client_ip}
+        self._prefix = (
+            b'{"metadata":' + _dumps(self._metadata) + b',"type":'
+            if wire.JSON_WIRE
+            else None
+        )
+        # type code -> prefix bytes through '"payload":', so repeat sends of
+        # a type only serialize the payload itself
+        self._prefix_by_type = {}
+        # lazily-built cache of fully-encoded messages whose bytes never vary
+        # (registration, acks, etc.) so hot paths skip encoding entirely
+        self._const_msgs = {}
+        # recipient name -> (ip, port), rebuilt on every state_change so DM
+        # paths skip the nested metadata lookups per send
+        self._dest_cache = {}
 
     def encode_message(self, type, payload=None):
         """Convert plaintext user input to serialized message 'packet'."""
-        metadata = {**self.opts, "client_ip": self.client_ip}
-        message = {"type": type, "payload": payload, "metadata": metadata}
-        return json.dumps(message).encode("utf-8")
+        if self._prefix is not None:
+            head = self._prefix_by_type.get(type)
+            if head is None:
+                head = self._prefix_by_type[type] = (
+                    self._prefix + _dumps(type) + b',"payload":'
+                )
+            return head + _dumps(payload) + b"}"
+        return _dumps({"type": type, "payload": payload, "metadata": self._metadata})
+
+    def _const_message(self, type, payload=None):
+        """Returns the cached encoding of a message whose content never varies."""
+        message = self._const_msgs.get(type)
+        if message is None:
+            message = self._const_msgs[type] = self.encode_message(type, payload)
+        return message
+
+    def _wake_listener(self):
+        """Unblocks the listener's recvfrom with a loopback sentinel datagram."""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as wake_sock:
+                wake_sock.sendto(
+                    WAKE_SENTINEL, ("127.0.0.1", self.opts["client_port"])
+                )
+        except OSError:
+            pass
 
     def exit_server_not_respond(self):
         """Prints error message and exits client."""
@@ -62,10 +121,11 @@ class Client:
         # logger.info("\rServer not responding")
         # logger.info("\rExiting")
         self.stop_event.set()
+        self._wake_listener()
 
     def decode_message(self, message):
         """Convert bytes to deserialized JSON."""
-        return json.loads(message.decode("utf-8"))
+        return _loads(message)
 
     # def log(self, message, is_end=False):
     #     """Custom logger w/ prefixing based on group chat."""
@@ -76,14 +136,38 @@ class Client:
     def create_sock(self):
         """Create a socket."""
         try:
-            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         except socket.error as e:
             raise ClientError(f"UDP client error when creating socket: {e}")
 
+        # Default kernel buffers (~208KiB) drop bursty small packets (e.g. a
+        # state_change fanout); bigger buffers absorb them while we're busy
+        # parsing. Best-effort since the kernel caps at net.core.{r,w}mem_max.
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+            logger.debug(
+                "socket buffers granted: rcv=%d snd=%d",
+                sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF),
+            )
+        except OSError:
+            pass
+
+        # per-option since kernels/permissions vary (e.g. SO_BUSY_POLL may
+        # need CAP_NET_ADMIN); missing any of these is never fatal
+        for level, opt, value in LATENCY_SOCKOPTS:
+            try:
+                sock.setsockopt(level, opt, value)
+            except OSError:
+                pass
+        return sock
+
     def signal_handler(self, signum, _frame):
         """Custom wrapper that throws error when exit signal received."""
         print()  # this adds a nice newline when `^C` is entered
         self.stop_event.set()
+        self._wake_listener()
         raise ClientError(f"Client aborted... {signum}")
 
     def print_inbox(self):
@@ -91,205 +175,315 @@ class Client:
         for inbox_message in self.inbox:
             message = inbox_message.get("message", "")
             sender = inbox_message.get("sender", "")
-            logger.info(f">>> {sender}: {message}")
+            logger.info(">>> %s: %s", sender, message)
         self.inbox = []
 
+    def _ack_received(self):
+        """Marks the in-flight request as ACK'ed & wakes any waiting retry loop."""
+        self.waiting_for_ack = False
+        self._ack_event.set()
+
+    def _h_registration_confirmation(self, payload):
+        logger.info("Welcome, You are registered.")
+        self.is_registered = True
+        self._ack_received()
+
+    def _h_registration_error(self, payload):
+        logger.info(payload.get("payload", {}).get("message", ""))
+        self.stop_event.set()
+
+    def _h_state_change(self, payload):
+        self.connections = payload.get("payload")
+        self._dest_cache = {
+            name: (meta.get("client_ip"), meta.get("client_port"))
+            for name, meta in self.connections.items()
+        }
+        logger.info("Client table updated.")
+
+    def _h_deregistration_confirmation(self, payload):
+        self._ack_received()
+        self.is_registered = False
+        logger.info("You are Offline. Bye.")
+        self.stop_event.set()
+
+    def _h_create_group_ack(self, payload):
+        group_name = payload.get("payload")
+        self._ack_received()
+        logger.info("Group %s created by Server.", group_name)
+
+    def _h_create_group_error(self, payload):
+        self._ack_received()
+        logger.info(payload.get("payload", {}).get("message", ""))
+
+    def _h_join_group_ack(self, payload):
+        group_name = payload.get("payload")
+        self._ack_received()
+        self.active_group = group_name
+        logger.info("Entered group %s successfully!", group_name)
+
+    def _h_join_group_error(self, payload):
+        self._ack_received()
+        logger.info(payload.get("payload", {}).get("message", ""))
+
+    def _h_list_groups_ack(self, payload):
+        groups = payload.get("payload", {}).get("groups", [])
+        self._ack_received()
+        logger.info("Available group chats:")
+        for group in groups:
+            logger.info(group)
+
+    def _h_message(self, payload):
+        sender_name = payload.get("metadata", {}).get("name")
+        message = payload.get("payload", "")
+        if not self.active_group:
+            logger.info("%s: %s", sender_name, message)
+            # send ack back to user
+            self.send_dm_ack(sender_name)
+        else:
+            self.send_dm_ack(sender_name)
+            self.inbox.append({"sender": sender_name, "message": message})
+
+    def _h_message_ack(self, payload):
+        self._ack_received()
+        recipient_name = payload.get("payload", "")
+        logger.info("Message received by %s", recipient_name)
+
+    def _h_client_offline_ack(self, payload):
+        self._ack_received()
+        offline_client_name = payload.get("payload", "")
+        logger.info(
+            "Auto-deregistered %s since they were offline.", offline_client_name
+        )
+
+    def _h_group_message(self, payload):
+        pl = payload.get("payload", {})
+        logger.info(
+            "(%s) Group_Message %s: %s",
+            self.active_group,
+            pl.get("sender"),
+            pl.get("message"),
+        )
+        ## send ack back to server of recieved group_message
+        self.send_group_message_ack()
+
+    def _h_members_list(self, payload):
+        self._ack_received()
+        members = payload.get("payload", {}).get("members")
+        logger.info("(%s) Members in the group %s:", self.active_group, self.active_group)
+        for member in members:
+            logger.info("(%s) %s", self.active_group, member)
+
+    def _h_leave_group_ack(self, payload):
+        self._ack_received()
+        logger.info("Leave group chat %s", self.active_group)
+        self.active_group = None
+        self.print_inbox()
+
+    def _h_group_message_ack(self, payload):
+        self._ack_received()
+        logger.info("(%s) Message received by Server.", self.active_group)
+
+    def _h_unknown(self, payload):
+        logger.info("got unknown message: %s", payload)
+
+    # Same trick as _HANDLERS below: one dict lookup on the type code instead
+    # of walking an if/elif chain for every incoming packet
+    _DISPATCH = {
+        MT.REGISTRATION_CONFIRMATION: _h_registration_confirmation,
+        MT.REGISTRATION_ERROR: _h_registration_error,
+        MT.STATE_CHANGE: _h_state_change,
+        MT.DEREGISTRATION_CONFIRMATION: _h_deregistration_confirmation,
+        MT.CREATE_GROUP_ACK: _h_create_group_ack,
+        MT.CREATE_GROUP_ERROR: _h_create_group_error,
+        MT.JOIN_GROUP_ACK: _h_join_group_ack,
+        MT.JOIN_GROUP_ERROR: _h_join_group_error,
+        MT.LIST_GROUPS_ACK: _h_list_groups_ack,
+        MT.MESSAGE: _h_message,
+        MT.MESSAGE_ACK: _h_message_ack,
+        MT.CLIENT_OFFLINE_ACK: _h_client_offline_ack,
+        MT.GROUP_MESSAGE: _h_group_message,
+        MT.MEMBERS_LIST: _h_members_list,
+        MT.LEAVE_GROUP_ACK: _h_leave_group_ack,
+        MT.GROUP_MESSAGE_ACK: _h_group_message_ack,
+    }
+
     def handle_request(self, sock, sender_ip, payload):
         """Handle different request types (e.g. registration_confirmation)."""
-        request_type = payload.get("type", "")
-
-        if request_type == "registration_confirmation":
-            logger.info("Welcome, You are registered.")
-            self.is_registered = True
-            self.waiting_for_ack = False
-        elif request_type == "registration_error":
-            logger.info(payload.get("payload", {}).get("message", ""))
-            self.stop_event.set()
-        elif request_type == "state_change":
-            self.connections = payload.get("payload")
-            logger.info("Client table updated.")
-        elif request_type == "deregistration_confirmation":
-            self.waiting_for_ack = False
-            self.is_registered = False
-            logger.info("You are Offline. Bye.")
-            self.stop_event.set()
-        elif request_type == "create_group_ack":
-            group_name = payload.get("payload")
-            self.waiting_for_ack = False
-            logger.info(f"Group {group_name} created by Server.")
-        elif request_type == "create_group_error":
-            group_name = payload.get("payload")
-            self.waiting_for_ack = False
-            logger.info(payload.get("payload", {}).get("message", ""))
-        elif request_type == "join_group_ack":
-            group_name = payload.get("payload")
-            self.waiting_for_ack = False
-            self.active_group = group_name
-            logger.info(f"Entered group {group_name} successfully!")
-        elif request_type == "join_group_error":
-            group_name = payload.get("payload")
-            self.waiting_for_ack = False
-            logger.info(payload.get("payload", {}).get("message", ""))
-        elif request_type == "list_groups_ack":
-            groups = payload.get("payload", {}).get("groups", [])
-            self.waiting_for_ack = False
-            logger.info("Available group chats:")
-            for group in groups:
-                logger.info(group)
-        elif request_type == "message":
-            sender_name = payload.get("metadata", {}).get("name")
-            message = payload.get("payload", "")
-            if not self.active_group:
-                logger.info(f"{sender_name}: {message}")
-                # send ack back to user
-                self.send_dm_ack(sock, sender_name)
-            else:
-                self.send_dm_ack(sock, sender_name)
-                self.inbox.append({"sender": sender_name, "message": message})
-        elif request_type == "message_ack":
-            self.waiting_for_ack = False
-            recipient_name = payload.get("payload", "")
-            logger.info(f"Message received by {recipient_name}")
-        elif request_type == "client_offline_ack":
-            self.waiting_for_ack = False
-            offline_client_name = payload.get("payload", "")
-            logger.info(
-                f"Auto-deregistered {offline_client_name} since they were offline."
-            )
-        elif request_type == "group_message":
-            message = payload.get("payload", {}).get("message")
-            sender = payload.get("payload", {}).get("sender")
-            print(f">>> ({self.active_group}) Group_Message {sender}: {message}")
-            self.send_group_message_ack(sock)
-
-            ## send ack back to server of recieved group_message
-        elif request_type == "members_list":
-            self.waiting_for_ack = False
-            members = payload.get("payload", {}).get("members")
-            print(
-                f">>> ({self.active_group}) [Members in the group {self.active_group}:]"
-            )
-            for member in members:
-                print(f">>> ({self.active_group}) {member}")
-        elif request_type == "leave_group_ack":
-            self.waiting_for_ack = False
-            logger.info(f"Leave group chat {self.active_group}")
-            self.active_group = None
-            self.print_inbox()
-        elif request_type == "group_message_ack":
-            self.waiting_for_ack = False
-            print(f">>> ({self.active_group}) [Message received by Server.]")
-        else:
-            logger.info(f"got unknown message: {payload}")
+        handler = self._DISPATCH.get(payload.get("type"), Client._h_unknown)
+        handler(self, payload)
 
-    def send_dm(self, sock, recipient_name, user_input):
+    def send_dm(self, recipient_name, user_input):
         """Sends a private DM to another client."""
-        message = self.encode_message("message", user_input)
-        if recipient_name not in self.connections:
-            logger.info(f"Unable to send to non-existent {recipient_name}.")
+        message = self.encode_message(MT.MESSAGE, user_input)
+        client_destination = self._dest_cache.get(recipient_name)
+        if client_destination is None:
+            logger.info("Unable to send to non-existent %s.", recipient_name)
             return
 
-        recipient_metadata = self.connections.get(recipient_name, {})
-        client_port = recipient_metadata.get("client_port")
-        client_ip = recipient_metadata.get("client_ip")
-        client_destination = (client_ip, client_port)
+        if not self._send_with_retry(message, dest=client_destination):
+            logger.info("No ACK from %s, message not delivered", recipient_name)
+            # We still need to see if server is online, otherwise that means OUR client is offline
+            self.notify_server_client_offline(recipient_name)
+
+    def server_send(self, message):
+        """Sends already encoded message to server over the connected socket.
 
-        retries = 0
+        Fire-and-forget: a dead server shows up here as an OSError (ICMP
+        port-unreachable on a connected UDP socket) and the packet is simply
+        dropped — callers that need delivery go through _send_with_retry.
+        """
+        try:
+            self.srv_sock.send(message)
+        except OSError:
+            pass
+
+    def _send_with_retry(self, message, dest=None):
+        """Sends a message up to 6x 'till it's ACK'ed, waiting `delay` between.
+
+        Goes over the connected server socket unless a peer `dest` is given.
+        The listener thread sets the ACK event the moment the ACK lands, so
+        we wake after one RTT instead of a full 500ms tick. Returns False if
+        every attempt timed out.
+        """
+        self._ack_event.clear()
         self.waiting_for_ack = True
-        while self.waiting_for_ack and retries <= 5:  ## Wait for ack 5x 500ms each
-            sock.sendto(message, client_destination)
-            # We don't want to sleep on the 5th time we just exit
-            if retries <= 4:
-                time.sleep(self.delay)
-            retries += 1
-        if self.waiting_for_ack:
-            logger.info(f"No ACK from {recipient_name}, message not delivered")
-            # We still need to see if server is online, otherwise that means OUR client is offline
-            self.notify_server_client_offline(sock, recipient_name)
+        # bind the bound-methods once; each loop iteration is then LOAD_FAST
+        _send = self.srv_sock.send if dest is None else self.sock.sendto
+        _wait = self._ack_event.wait
+        for _ in range(6):  ## Wait for ack 5x 500ms each
+            # The connected server socket surfaces ICMP port-unreachable as
+            # an OSError on a later send; treat it like a lost packet so the
+            # normal timeout -> "Server not responding" path still fires
+            try:
+                if dest is None:
+                    _send(message)
+                else:
+                    _send(message, dest)
+            except OSError:
+                pass
+            if _wait(self.delay) or self.stop_event.is_set():
+                break
+        return not self.waiting_for_ack
 
-    def server_send(self, sock, message):
-        """Sends already encoded message to server."""
-        server_destination = (self.opts["server_ip"], self.opts["server_port"])
-        sock.sendto(message, server_destination)
+    def _server_command(self, message):
+        """Sends a command to the server, exiting if it never ACKs."""
+        if not self._send_with_retry(message):
+            self.exit_server_not_respond()
 
-    @handles_retries
-    def list_groups(self, sock):
+    def list_groups(self):
         """Sends list_group command to server."""
-        registration_message = self.encode_message("list_groups")
-        self.server_send(sock, registration_message)
+        self._server_command(self._const_message(MT.LIST_GROUPS))
 
-    @handles_retries
-    def create_group(self, sock, group_name):
+    def create_group(self, group_name):
         """Sends create_group command to server."""
-        create_group_message = self.encode_message("create_group", group_name)
-        self.server_send(sock, create_group_message)
+        self._server_command(self.encode_message(MT.CREATE_GROUP, group_name))
 
-    @handles_retries
-    def notify_server_client_offline(self, sock, client_name):
+    def notify_server_client_offline(self, client_name):
         """Notifies server a client didn't respond."""
-        offline_message = self.encode_message("client_offline", client_name)
-        self.server_send(sock, offline_message)
+        self._server_command(self.encode_message(MT.CLIENT_OFFLINE, client_name))
 
-    def send_group_message_ack(self, sock):
+    def send_group_message_ack(self):
         """Sends an ack back to server of recieved group message."""
         group_ack_payload = {"group": self.active_group}
-        group_ack_message = self.encode_message("group_message_ack", group_ack_payload)
-        self.server_send(sock, group_ack_message)
+        group_ack_message = self.encode_message(MT.GROUP_MESSAGE_ACK, group_ack_payload)
+        self.server_send(group_ack_message)
 
-    @handles_retries
-    def send_group_message(self, sock, message):
+    def send_group_message(self, message):
         """Sends group chat message to server."""
         group_message_payload = {"message": message, "group": self.active_group}
-        group_message = self.encode_message("group_message", group_message_payload)
-        self.server_send(sock, group_message)
+        self._server_command(self.encode_message(MT.GROUP_MESSAGE, group_message_payload))
 
-    @handles_retries
-    def join_group(self, sock, group_name):
+    def join_group(self, group_name):
         """Sends join_group command to server."""
-        join_group_message = self.encode_message("join_group", group_name)
-        self.server_send(sock, join_group_message)
+        self._server_command(self.encode_message(MT.JOIN_GROUP, group_name))
 
-    def send_dm_ack(self, sock, recipient_name):
+    def send_dm_ack(self, recipient_name):
         """Sends an ACK to the sender of an incoming DM."""
-        recipient_metadata = self.connections.get(recipient_name, {})
-        client_port = recipient_metadata.get("client_port")
-        client_ip = recipient_metadata.get("client_ip")
-        client_destination = (client_ip, client_port)
-        message = self.encode_message("message_ack", self.opts["name"])
+        client_destination = self._dest_cache.get(recipient_name)
+        if client_destination is None:
+            return
+        message = self._const_message(MT.MESSAGE_ACK, self.opts["name"])
         try:
-            sock.sendto(message, client_destination)
+            self.sock.sendto(message, client_destination)
         except socket.error as e:
             raise ClientError(f"UDP socket error: {e}")
 
-    @handles_retries
-    def send_list_group_members(self, sock):
+    def send_list_group_members(self):
         """Sends list_members command to server."""
         list_members_payload = {"group": self.active_group}
-        list_members_message = self.encode_message("list_members", list_members_payload)
-        self.server_send(sock, list_members_message)
+        self._server_command(self.encode_message(MT.LIST_MEMBERS, list_members_payload))
 
-    @handles_retries
-    def send_leave_group(self, sock):
+    def send_leave_group(self):
         """Sends leave_group command to server."""
         leave_group_payload = {"group": self.active_group}
-        leave_group_message = self.encode_message("leave_group", leave_group_payload)
-        self.server_send(sock, leave_group_message)
+        self._server_command(self.encode_message(MT.LEAVE_GROUP, leave_group_payload))
+
+    # Commands allowed per mode, precomputed once instead of rebuilt (three
+    # list concatenations) on every line of user input
+    _GC_CMDS = frozenset({"dereg", "send", "send_group", "list_members", "leave_group"})
+    _DM_CMDS = frozenset({"dereg", "send", "create_group", "list_groups", "join_group"})
 
     def is_invalid_cmd(self, user_input):
         """Checks if command is supported based on mode (group,dm)."""
-        both_commands = ["dereg", "send"]
-        gc_commands = ["send_group", "list_members", "leave_group"] + both_commands
-        dm_commands = ["create_group", "list_groups", "join_group"] + both_commands
-        command = user_input.split(" ")[0]
-        # if not a normal command at all throw
-        cmd_not_exist = command not in gc_commands + dm_commands
-        # if in group and command is not in gc_commands throw
-        invalid_group_cmd = self.active_group is not None and command not in gc_commands
-        # if not in group and command in gc_commands throw
-        invalid_dm_cmd = self.active_group is None and command not in dm_commands
-        return cmd_not_exist or invalid_group_cmd or invalid_dm_cmd
-
-    def send_message(self, sock, user_input):
+        command = user_input.split(" ", 1)[0]
+        allowed = self._GC_CMDS if self.active_group is not None else self._DM_CMDS
+        return command not in allowed
+
+    def _cmd_dereg(self, rest):
+        """Handles `dereg <name>`."""
+        dereg_name = rest.split(" ")[0]
+        if dereg_name != self.opts["name"]:
+            logger.info("You can only deregister yourself.")
+        else:
+            self.deregister()
+
+    def _cmd_send(self, rest):
+        """Handles `send <name> <message>`."""
+        name, _, message = rest.partition(" ")
+        self.send_dm(name, message)
+
+    def _cmd_create_group(self, rest):
+        """Handles `create_group <name>`."""
+        self.create_group(rest.split(" ")[0])
+
+    def _cmd_list_groups(self, rest):
+        """Handles `list_groups`."""
+        self.list_groups()
+
+    def _cmd_list_members(self, rest):
+        """Handles `list_members`."""
+        self.send_list_group_members()
+
+    def _cmd_join_group(self, rest):
+        """Handles `join_group <name>`."""
+        if self.active_group:
+            logger.info("Already in %s. Run `leave_group` first.", self.active_group)
+        else:
+            self.join_group(rest.split(" ")[0])
+
+    def _cmd_send_group(self, rest):
+        """Handles `send_group <message>`."""
+        self.send_group_message(rest)
+
+    def _cmd_leave_group(self, rest):
+        """Handles `leave_group`."""
+        self.send_leave_group()
+
+    # One dict lookup on the first token instead of trying ~8 regexes in a row
+    _HANDLERS = {
+        "dereg": _cmd_dereg,
+        "send": _cmd_send,
+        "create_group": _cmd_create_group,
+        "list_groups": _cmd_list_groups,
+        "list_members": _cmd_list_members,
+        "join_group": _cmd_join_group,
+        "send_group": _cmd_send_group,
+        "leave_group": _cmd_leave_group,
+    }
+    # Commands that are meaningless without an argument after the first token
+    _ARG_CMDS = frozenset({"dereg", "send", "create_group", "join_group", "send_group"})
+
+    def send_message(self, user_input):
         """Parses user plaintext and sends to proper destination."""
         if self.is_invalid_cmd(user_input):
             cmd_literal = user_input.split(" ")[0]
@@ -297,37 +491,16 @@ class Client:
             print(f">>> {group_prefix}Invalid command: {cmd_literal}")
             return
 
-        # Pattern match inputs to command methods
-        if re.match("dereg (.*)", user_input):
-            dereg_name = user_input.split(" ")[1]
-            if dereg_name != self.opts["name"]:
-                logger.info("You can only deregister yourself.")
-            else:
-                self.deregister(sock)
-        elif re.match("send (.*) (.*)", user_input):
-            name = user_input.split(" ")[1]
-            message = " ".join(user_input.split(" ")[2:])
-            self.send_dm(sock, name, message)
-        elif re.match("create_group (.*)", user_input):
-            group_name = user_input.split(" ")[1]
-            self.create_group(sock, group_name)
-        elif re.match("list_groups", user_input):
-            self.list_groups(sock)
-        elif re.match("list_members", user_input):
-            self.send_list_group_members(sock)
-        elif re.match("join_group (.*)", user_input):
-            if self.active_group:
-                logger.info(f"Already in {self.active_group}. Run `leave_group` first.")
-            else:
-                group_name = user_input.split(" ")[1]
-                self.join_group(sock, group_name)
-        elif re.match("send_group (.*)", user_input):
-            message = " ".join(user_input.split(" ")[1:])
-            self.send_group_message(sock, message)
-        elif re.match("leave_group", user_input):
-            self.send_leave_group(sock)
+        command, _, rest = user_input.partition(" ")
+        handler = self._HANDLERS.get(command)
+        missing_args = command in self._ARG_CMDS and not rest
+        # `send` needs both a recipient and a message
+        if command == "send" and " " not in rest:
+            missing_args = True
+        if handler is None or missing_args:
+            logger.info("Unknown command `%s`.", user_input)
         else:
-            logger.info(f"Unknown command `{user_input}`.")
+            handler(self, rest)
 
     def start(self):
         """Start both the user input listener and server event listener."""
@@ -335,58 +508,79 @@ class Client:
             # Handle signal events (e.g. `^C`)
             self.stop_event = Event()
             signal.signal(signal.SIGINT, self.signal_handler)
+            # One bound socket shared by the listener & every send site; peers
+            # and the server all reply to `client_port` anyway, so a second
+            # unbound sending socket just wasted an FD
+            self.sock = self.create_sock()
+            self.sock.bind(("", self.opts["client_port"]))
+            # Server-bound traffic goes over a connected socket so the hot
+            # send sites use send() & skip per-call destination handling;
+            # replies still land on the bound socket above via client_port
+            self.srv_sock = self.create_sock()
+            self.srv_sock.connect(self._server_addr)
             # start server listener
             server_thread = Thread(target=self.server_listen, args=(self.stop_event,))
             server_thread.start()
-            # Init sock for outbound messages
-            sock = self.create_sock()
-            # Deadloop input 'till client ends
-            while server_thread.is_alive() and not self.stop_event.is_set():
-                server_thread.join(1)
+            # Deadloop input 'till client ends; input() blocks anyway, so
+            # there's no need to also poll the listener thread with join(1)
+            while not self.stop_event.is_set():
                 ## Only handle input once registered
                 if self.is_registered:
                     group_prefix = (
                         f"({self.active_group}) " if self.active_group else ""
                     )
                     user_input = input(f">>> {group_prefix}")
-                    self.send_message(sock, user_input)
+                    self.send_message(user_input)
+                else:
+                    # registration confirmation hasn't landed yet
+                    self.stop_event.wait(0.05)
         except ClientError:
             # Prevent exceptions when quickly spamming `^C`
             signal.signal(signal.SIGINT, lambda s, f: None)
 
-    @handles_retries
-    def deregister(self, sock):
+    def deregister(self):
         """Sends deregistration request to server."""
-        deregistration_message = self.encode_message("deregistration")
-        self.server_send(sock, deregistration_message)
+        self._server_command(self._const_message(MT.DEREGISTRATION))
 
-    # @handles_retries
-    def register(self, sock):
+    def register(self):
         """Send initial registration message to server. If ack'ed log and continue."""
-        registration_message = self.encode_message("registration")
-        self.server_send(sock, registration_message)
+        self.server_send(self._const_message(MT.REGISTRATION))
 
     def server_listen(self, stop_event):
-        """Listens on specified `client_port` for messages from server."""
-        sock = self.create_sock()
-        sock.bind(("", self.opts["client_port"]))
-
-        sent_initial_register = False
-
-        while True:
-            # Listen for kill events
+        """Listens on the shared socket for messages from server."""
+        sock = self.sock
+        # One reusable receive buffer; recvfrom_into fills it in place so the
+        # kernel stops allocating a fresh bytes object per datagram
+        recv_buf = bytearray(4096)
+        recv_view = memoryview(recv_buf)
+
+        # register once we're bound & ready to hear the confirmation
+        self.register()
+
+        while not stop_event.is_set():
+            # Block in the kernel 'till a packet lands; shutdown paths poke
+            # us awake with a loopback sentinel instead of a poll timeout
+            try:
+                nbytes, (sender_ip, sender_port) = sock.recvfrom_into(recv_buf)
+            except OSError:
+                break
             if stop_event.is_set():
-                logger.info("stopping client-server listener")
                 break
-
-            if not sent_initial_register:
-                # register after we start listening on port
-                sent_initial_register = True
-                self.register(sock)
-
-            readables, writables, errors = select.select([sock], [], [], 1)
-            for read_socket in readables:
-                # logger.info("listening")
-                data, (sender_ip, sender_port) = read_socket.recvfrom(4096)
-                message = self.decode_message(data)
-                self.handle_request(read_socket, sender_ip, message)
+            data = recv_view[:nbytes]
+            if data != WAKE_SENTINEL:
+                self.handle_request(sock, sender_ip, self.decode_message(data))
+            # Drain everything else already buffered (e.g. a broadcast burst)
+            # before blocking again, one wakeup amortized across the batch
+            while MSG_DONTWAIT and not stop_event.is_set():
+                try:
+                    nbytes, (sender_ip, sender_port) = sock.recvfrom_into(
+                        recv_buf, 4096, MSG_DONTWAIT
+                    )
+                except OSError:
+                    # includes BlockingIOError once the buffer is empty
+                    break
+                data = recv_view[:nbytes]
+                if data != WAKE_SENTINEL:
+                    self.handle_request(sock, sender_ip, self.decode_message(data))
+
+        logger.info("stopping client-server listener")
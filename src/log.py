@@ -1,3 +1,4 @@
+import atexit
 import logging
 from queue import Queue
 from logging.handlers import QueueHandler, QueueListener
@@ -15,3 +16,5 @@ logger.addHandler(queue_handler)
 formatter = logging.Formatter(">>> [%(message)s]")
 handler.setFormatter(formatter)
 listener.start()
+# drain any queued records before interpreter teardown drops them
+atexit.register(listener.stop)
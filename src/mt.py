@@ -0,0 +1,32 @@
+class MT:
+    """Integer codes for the wire-level `type` field, shared by client & server.
+
+    Small ints serialize/parse faster & shorter than the long handler-name
+    strings they replace (e.g. "registration_confirmation" was 27 bytes on
+    every packet). Both sides must agree on these — this is the protocol.
+    """
+
+    REGISTRATION = 1
+    REGISTRATION_CONFIRMATION = 2
+    REGISTRATION_ERROR = 3
+    DEREGISTRATION = 4
+    DEREGISTRATION_CONFIRMATION = 5
+    STATE_CHANGE = 6
+    CREATE_GROUP = 7
+    CREATE_GROUP_ACK = 8
+    CREATE_GROUP_ERROR = 9
+    LIST_GROUPS = 10
+    LIST_GROUPS_ACK = 11
+    JOIN_GROUP = 12
+    JOIN_GROUP_ACK = 13
+    JOIN_GROUP_ERROR = 14
+    MESSAGE = 15
+    MESSAGE_ACK = 16
+    CLIENT_OFFLINE = 17
+    CLIENT_OFFLINE_ACK = 18
+    GROUP_MESSAGE = 19
+    GROUP_MESSAGE_ACK = 20
+    LIST_MEMBERS = 21
+    MEMBERS_LIST = 22
+    LEAVE_GROUP = 23
+    LEAVE_GROUP_ACK = 24
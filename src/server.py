@@ -1,11 +1,32 @@
 import socket
-import select
-import json
-from operator import itemgetter
-from threading import Thread, Lock
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Event, RLock, Thread
 import time
 
 from log import logger
+from mt import MT
+from mmsg import send_batch, RecvBatch
+import wire
+from wire import dumps as _dumps, loads as _loads
+
+# 12MiB kernel buffers (same as the client) so a registration storm or a big
+# group fanout doesn't overflow the default ~208KiB and trigger retries
+SOCK_BUF_SIZE = 12 * 1024 * 1024
+# Linux-only setsockopt names that ignore net.core.{r,w}mem_max (need CAP_NET_ADMIN)
+SO_SNDBUFFORCE = 32
+SO_RCVBUFFORCE = 33
+
+# Same best-effort latency knobs the client applies (see client.py):
+# DF pinned, higher queueing priority, 50us of receive busy-polling
+LATENCY_SOCKOPTS = (
+    (
+        socket.IPPROTO_IP,
+        getattr(socket, "IP_MTU_DISCOVER", 10),
+        getattr(socket, "IP_PMTUDISC_DO", 2),
+    ),
+    (socket.SOL_SOCKET, getattr(socket, "SO_PRIORITY", 12), 6),
+    (socket.SOL_SOCKET, getattr(socket, "SO_BUSY_POLL", 46), 50),
+)
 
 
 class ServerError(Exception):
@@ -22,42 +43,116 @@ class Server:
         self.groups = {}
         ## keyed by group and each entry is an array of clients
         ## thus each group chat stops & waits for all acks until taking new messages
-        self.outbound_group_ack_lock = Lock()
+        # Condition so the ack handler can wake the waiter the instant the
+        # last ack lands instead of the waiter sleep-polling in 500ms ticks
+        self.outbound_group_ack_cv = Condition()
         self.outbound_group_acks = {}
+        # long-lived workers for ack waits; spawning a Thread per group
+        # message paid pthread_create on the hot path
+        self._ack_exec = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="group-ack"
+        )
+        # decode+dispatch run off the receive thread so the UDP queue keeps
+        # draining while we handle a request (UDP has no backpressure — if
+        # the RX queue fills, the kernel just drops and clients hit retries)
+        self._work = ThreadPoolExecutor(max_workers=4, thread_name_prefix="request")
+        # serializes access to connections/groups across the handler
+        # workers, the flusher, and the ack waiters; reentrant so a holder
+        # can call helpers that take it again
+        self._state_lock = RLock()
+        # table changes only flag the state dirty; a flusher thread turns a
+        # burst of joins/leaves into one broadcast per coalescing window
+        # instead of N full-table fanouts (N clients joining was N^2 sends)
+        self._state_dirty = Event()
+        self._broadcast_sock = None
         self.delay = 500 / 1000  # 500ms (500ms/1000ms = 0.5s)
+        # opts never changes after startup, so serialize it once and splice
+        # the bytes into every outgoing packet, mirroring the client
+        # (fragment splicing only works when the wire format is JSON)
+        self._prefix = (
+            b'{"metadata":' + _dumps(self.opts) + b',"type":'
+            if wire.JSON_WIRE
+            else None
+        )
+        # type code -> prefix bytes through '"payload":', so repeat sends of
+        # a type only serialize the payload itself (same cache the client keeps)
+        self._prefix_by_type = {}
 
     def create_sock(self):
         """Create a socket."""
         try:
-            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         except socket.error as e:
             raise ServerError(f"UDP server error when creating socket: {e}")
 
+        # The *FORCE variants override the sysctl ceiling but need privileges;
+        # fall back to the capped plain setsockopt when they're refused.
+        for opt, forced in ((socket.SO_RCVBUF, SO_RCVBUFFORCE), (socket.SO_SNDBUF, SO_SNDBUFFORCE)):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, forced, SOCK_BUF_SIZE)
+            except OSError:
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, opt, SOCK_BUF_SIZE)
+                except OSError:
+                    pass
+        for level, opt, value in LATENCY_SOCKOPTS:
+            try:
+                sock.setsockopt(level, opt, value)
+            except OSError:
+                pass
+        return sock
+
     def encode_message(self, type, payload=None):
         """Convert plaintext user input to serialized message 'packet'."""
-        metadata = {**self.opts}
-        message = {"type": type, "payload": payload, "metadata": metadata}
-        return json.dumps(message).encode("utf-8")
+        if self._prefix is not None:
+            head = self._prefix_by_type.get(type)
+            if head is None:
+                head = self._prefix_by_type[type] = (
+                    self._prefix + _dumps(type) + b',"payload":'
+                )
+            return head + _dumps(payload) + b"}"
+        # self.opts is never mutated, so no need to copy it per packet;
+        # dumps doesn't touch its input
+        return _dumps({"type": type, "payload": payload, "metadata": self.opts})
 
     def decode_message(self, message):
         """Convert bytes to deserialized JSON."""
-        return json.loads(message.decode("utf-8"))
+        return _loads(message)
+
+    def _mark_state_dirty(self, sock):
+        """Queues a table broadcast; the flusher coalesces bursts into one."""
+        self._broadcast_sock = sock
+        self._state_dirty.set()
+
+    def _state_flusher(self):
+        """Flushes at most one state_change broadcast per 10ms window."""
+        while True:
+            self._state_dirty.wait()
+            # let the rest of a join/leave burst land in this window
+            time.sleep(0.01)
+            self._state_dirty.clear()
+            with self._state_lock:
+                self.dispatch_connections_change(self._broadcast_sock)
 
     def dispatch_connections_change(self, sock):
         """For all connections, send state change."""
+        # every recipient gets the same table snapshot; encode it once
+        message = self.encode_message(MT.STATE_CHANGE, self.connections)
+        datagrams = []
         for name, metadata in self.connections.items():
             ## SEND MESSAGE
-            client_port, sender_ip = itemgetter("client_port", "sender_ip")(metadata)
-            message = self.encode_message("state_change", self.connections)
-            sock.sendto(message, (sender_ip, client_port))
+            client_port, sender_ip = metadata["client_port"], metadata["sender_ip"]
+            datagrams.append((message, (sender_ip, client_port)))
+        # One sendmmsg syscall for the whole broadcast instead of N sendto's
+        send_batch(sock, datagrams)
 
     def new_client(self, metadata, sender_ip, sock):
         """Adds new client metadata to connections map & dispatches change to all others."""
         name = metadata.get("name")
         # @todo what happens if name already exists? We HAVE to cleanup old connection names
         self.connections[name] = {**metadata, "sender_ip": sender_ip}
-        logger.info(f"Server table updated.")
-        self.dispatch_connections_change(sock)
+        logger.info("Server table updated.")
+        self._mark_state_dirty(sock)
 
     def remove_client(self, metadata, sender_ip, sock):
         """Removes client from connection map & dispatches change to all others."""
@@ -67,220 +162,273 @@ class Server:
         # @todo we prob shouldn't delete, but mark as offline (maybe offline map)
         del self.connections[name]
         ## DON'T TOUCH GROUP CHAT LIST UNTIL ACK IS MISSING AND THEN WE FORCEFULLY REMOVE
-        logger.info(f"Server table updated. (removed client)")
-        self.dispatch_connections_change(sock)
+        logger.info("Server table updated. (removed client)")
+        self._mark_state_dirty(sock)
 
     def dispatch_group_message(self, sock, sender_name, group, message):
         """Dispatches group message to clients in group except sender."""
         group_clients = self.groups[group]
-        for client in list(filter(lambda user: user != sender_name, group_clients)):
+        # same bytes go to every recipient, so encode once outside the loop
+        group_message = self.encode_message(
+            MT.GROUP_MESSAGE, {"message": message, "sender": sender_name}
+        )
+        datagrams = []
+        for client in group_clients:
+            if client == sender_name:
+                continue
             client_metadata = self.connections[client]
-            client_port, sender_ip = itemgetter("client_port", "sender_ip")(
-                client_metadata
-            )
-            group_message = self.encode_message(
-                "group_message", {"message": message, "sender": sender_name}
-            )
-            sock.sendto(group_message, (sender_ip, client_port))
+            client_port = client_metadata["client_port"]
+            sender_ip = client_metadata["sender_ip"]
+            datagrams.append((group_message, (sender_ip, client_port)))
+        # One sendmmsg syscall for the whole group instead of N sendto's
+        send_batch(sock, datagrams)
 
     def wait_for_group_acks(self, sender_name, group, sock):
         """Waits for ACK from all clients in dispatch list for a group message."""
 
-        # with self.outbound_group_ack_lock:
-        #     print(
-        #         "waiting for group acks: ", sender_name, group, self.outbound_group_acks
-        #     )
         # we don't want to wait for ack from sender
-        expected_acks = list(filter(lambda u: u != sender_name, self.groups[group]))
+        with self._state_lock:
+            expected_acks = {
+                user for user in self.groups[group] if user != sender_name
+            }
         # print(f"expected acks: {expected_acks}")
 
-        retries = 0
-        waiting_for_acks = True
-        while waiting_for_acks and retries <= 5:  ## Wait for ack 5x 500ms each
-            with self.outbound_group_ack_lock:
-                # order both lists and compare
-                waiting_for_acks = sorted(self.outbound_group_acks[group]) != sorted(
-                    expected_acks
-                )
-
-            # We don't want to sleep on the 5th time we just exit
-            if retries <= 4:
-                time.sleep(self.delay)
-            retries += 1
-        if waiting_for_acks:
-            unacked_clients = list(
-                set(expected_acks) - set(self.outbound_group_acks[group])
+        ## Same 5x 500ms budget as before, but the ack handler notifies the
+        ## condition so we return the moment the last ack lands
+        with self.outbound_group_ack_cv:
+            all_acked = self.outbound_group_ack_cv.wait_for(
+                lambda: self.outbound_group_acks[group] >= expected_acks,
+                timeout=5 * self.delay,
             )
+        if not all_acked:
+            with self.outbound_group_ack_cv:
+                unacked_clients = expected_acks - self.outbound_group_acks[group]
             # logger.info(f"Error; Unacked messages from {unacked_clients}")
             for unacked_client in unacked_clients:
-                self.groups[group].remove(unacked_client)
+                with self._state_lock:
+                    self.groups[group].remove(unacked_client)
                 logger.info(
-                    f"Client {unacked_client} not responsive, removed from group {group}"
+                    "Client %s not responsive, removed from group %s",
+                    unacked_client,
+                    group,
                 )
         # else:
         #     # logger.info(f"got proper acks!")
 
-    def handle_request(self, sock, sender_ip, payload):
-        """Handles different request types (e.g. registration)."""
-        request_type = payload.get("type", "")
-        if request_type == "registration":
-            ## Send back registration ack
-            metadata = payload.get("metadata")
-            name = metadata.get("name")
-            client_port = metadata.get("client_port")
-
-            if name in self.connections:
-                ## We don't allow duplicate names in table
-                error_payload = {"message": f"`{name}` already exists!"}
-                message = self.encode_message("registration_error", error_payload)
-                sock.sendto(message, (sender_ip, client_port))
-            else:
-                message = self.encode_message("registration_confirmation")
-                sock.sendto(message, (sender_ip, client_port))
-                self.new_client(metadata, sender_ip, sock)
-        elif request_type == "deregistration":
-            ## Send back deregistration ack
-            metadata = payload.get("metadata")
-            client_port = metadata.get("client_port")
-            message = self.encode_message("deregistration_confirmation")
-            sock.sendto(message, (sender_ip, client_port))
-            ## Update table
-            self.remove_client(metadata, sender_ip, sock)
-        elif request_type == "create_group":
-            metadata = payload.get("metadata")
-            requester_name = metadata.get("name")
-            group_name = payload.get("payload")
-            client_port = metadata.get("client_port")
-            if group_name in self.groups.keys():
-                logger.warning(
-                    f"Client {requester_name} creating group `{group_name}` failed, group already exists"
-                )
-                error_payload = {"message": f"Group `{group_name}` already exists."}
-                message = self.encode_message("create_group_error", error_payload)
-                sock.sendto(message, (sender_ip, client_port))
-            else:
-                self.groups[group_name] = []
-                logger.info(
-                    f"Client {requester_name} created group `{group_name}` successfully!"
-                )
-                message = self.encode_message("create_group_ack", group_name)
-                sock.sendto(message, (sender_ip, client_port))
-        elif request_type == "list_groups":
-            metadata = payload.get("metadata")
-            client_name = metadata.get("name")
-            client_port = metadata.get("client_port")
-            groups = list(self.groups.keys())
-            logger.info(
-                f"Client {client_name} requested listing groups, current groups:"
-            )
-            for group in groups:
-                logger.info(group)
-            message = self.encode_message("list_groups_ack", {"groups": groups})
+    def _handle_registration(self, sock, sender_ip, payload):
+        ## Send back registration ack
+        metadata = payload.get("metadata")
+        name = metadata.get("name")
+        client_port = metadata.get("client_port")
+
+        if name in self.connections:
+            ## We don't allow duplicate names in table
+            error_payload = {"message": f"`{name}` already exists!"}
+            message = self.encode_message(MT.REGISTRATION_ERROR, error_payload)
             sock.sendto(message, (sender_ip, client_port))
-        elif request_type == "join_group":
-            metadata = payload.get("metadata")
-            requester_name = metadata.get("name")
-            group_name = payload.get("payload")
-            client_port = metadata.get("client_port")
-            if group_name not in self.groups.keys():
-                logger.warning(
-                    f"Client {requester_name} joining group `{group_name}` failed, group does not exist"
-                )
-                error_payload = {"message": f"Group `{group_name}` does not exist."}
-                message = self.encode_message("join_group_error", error_payload)
-                sock.sendto(message, (sender_ip, client_port))
-            else:
-                self.groups[group_name].append(requester_name)
-                logger.info(f"Client {requester_name} joined group `{group_name}`")
-                message = self.encode_message("join_group_ack", group_name)
-                sock.sendto(message, (sender_ip, client_port))
-        elif request_type == "client_offline":
-            ## Send back deregistration ack
-            offline_client_name = payload.get("payload")
-            # deregister auto based on disconnected state sending DM between clients
-            del self.connections[offline_client_name]
-            logger.info(f"Server table updated.")
-            self.dispatch_connections_change(sock)
-            metadata = payload.get("metadata")
-            client_port = metadata.get("client_port")
-            # send dereg ack to client
-            message = self.encode_message("client_offline_ack", offline_client_name)
+        else:
+            message = self.encode_message(MT.REGISTRATION_CONFIRMATION)
             sock.sendto(message, (sender_ip, client_port))
-        elif request_type == "group_message":
-            ## send message to all clients within group
-            ## @todo if the ack gets lost does that mean client sends duplicate messages?
-            metadata = payload.get("metadata", {})
-            sender_name = metadata.get("name", "")
-            client_port = metadata.get("client_port")
-            message = payload.get("payload", {}).get("message", "")
-            ## Send ack to sender
-            message_ack = self.encode_message("group_message_ack")
-            sock.sendto(message_ack, (sender_ip, client_port))
-            logger.info(f"Client {sender_name} sent group message: {message}")
-            ## Dispatch message
-            group = payload.get("payload", {}).get("group", "")
-
-            # reset the group acks that we wait for in thread
-            with self.outbound_group_ack_lock:
-                self.outbound_group_acks[group] = []
-
-            self.dispatch_group_message(sock, sender_name, group, message)
-
-            wait_for_acks_thread = Thread(
-                target=self.wait_for_group_acks,
-                args=(sender_name, group, sock),
-            )
-            wait_for_acks_thread.start()
-        elif request_type == "group_message_ack":
-            group = payload.get("payload", {}).get("group", "")
-            metadata = payload.get("metadata", {})
-            sender_name = metadata.get("name", "")
-            logger.info(f"Client {sender_name} acked group message")
-            with self.outbound_group_ack_lock:
-                self.outbound_group_acks[group].append(sender_name)
-
-        elif request_type == "list_members":
-            group = payload.get("payload", {}).get("group", "")
-            client_name = payload.get("metadata", {}).get("name", "")
-            # get list of users in group
-            group_members = self.groups[group]
-            metadata = payload.get("metadata", {})
-            message_ack = self.encode_message(
-                "members_list", {"members": group_members}
+            self.new_client(metadata, sender_ip, sock)
+
+    def _handle_deregistration(self, sock, sender_ip, payload):
+        ## Send back deregistration ack
+        metadata = payload.get("metadata")
+        client_port = metadata.get("client_port")
+        message = self.encode_message(MT.DEREGISTRATION_CONFIRMATION)
+        sock.sendto(message, (sender_ip, client_port))
+        ## Update table
+        self.remove_client(metadata, sender_ip, sock)
+
+    def _handle_create_group(self, sock, sender_ip, payload):
+        metadata = payload.get("metadata")
+        requester_name = metadata.get("name")
+        group_name = payload.get("payload")
+        client_port = metadata.get("client_port")
+        if group_name in self.groups:
+            logger.warning(
+                "Client %s creating group `%s` failed, group already exists",
+                requester_name,
+                group_name,
             )
+            error_payload = {"message": f"Group `{group_name}` already exists."}
+            message = self.encode_message(MT.CREATE_GROUP_ERROR, error_payload)
+            sock.sendto(message, (sender_ip, client_port))
+        else:
+            self.groups[group_name] = []
             logger.info(
-                f"Client {client_name} requested listing members of group {group}"
+                "Client %s created group `%s` successfully!",
+                requester_name,
+                group_name,
             )
-            for members in group_members:
-                logger.info(members)
-            client_port = metadata.get("client_port")
-            sock.sendto(message_ack, (sender_ip, client_port))
-
-        elif request_type == "leave_group":
-            group = payload.get("payload", {}).get("group", "")
-            metadata = payload.get("metadata", {})
-            sender_name = metadata.get("name", "")
-            # remove user from list in group
-            self.groups[group].remove(sender_name)
-            message_ack = self.encode_message("leave_group_ack")
-            client_port = metadata.get("client_port")
-            sock.sendto(message_ack, (sender_ip, client_port))
-            logger.info(f"Client {sender_name} left group {group}")
+            message = self.encode_message(MT.CREATE_GROUP_ACK, group_name)
+            sock.sendto(message, (sender_ip, client_port))
+
+    def _handle_list_groups(self, sock, sender_ip, payload):
+        metadata = payload.get("metadata")
+        client_name = metadata.get("name")
+        client_port = metadata.get("client_port")
+        groups = list(self.groups)
+        logger.info(
+            "Client %s requested listing groups, current groups:", client_name
+        )
+        for group in groups:
+            logger.info(group)
+        message = self.encode_message(MT.LIST_GROUPS_ACK, {"groups": groups})
+        sock.sendto(message, (sender_ip, client_port))
+
+    def _handle_join_group(self, sock, sender_ip, payload):
+        metadata = payload.get("metadata")
+        requester_name = metadata.get("name")
+        group_name = payload.get("payload")
+        client_port = metadata.get("client_port")
+        if group_name not in self.groups:
+            logger.warning(
+                "Client %s joining group `%s` failed, group does not exist",
+                requester_name,
+                group_name,
+            )
+            error_payload = {"message": f"Group `{group_name}` does not exist."}
+            message = self.encode_message(MT.JOIN_GROUP_ERROR, error_payload)
+            sock.sendto(message, (sender_ip, client_port))
         else:
-            print("got another request: ", sender_ip, payload)
+            self.groups[group_name].append(requester_name)
+            logger.info("Client %s joined group `%s`", requester_name, group_name)
+            message = self.encode_message(MT.JOIN_GROUP_ACK, group_name)
+            sock.sendto(message, (sender_ip, client_port))
+
+    def _handle_client_offline(self, sock, sender_ip, payload):
+        ## Send back deregistration ack
+        offline_client_name = payload.get("payload")
+        # deregister auto based on disconnected state sending DM between clients
+        del self.connections[offline_client_name]
+        logger.info("Server table updated.")
+        self._mark_state_dirty(sock)
+        metadata = payload.get("metadata")
+        client_port = metadata.get("client_port")
+        # send dereg ack to client
+        message = self.encode_message(MT.CLIENT_OFFLINE_ACK, offline_client_name)
+        sock.sendto(message, (sender_ip, client_port))
+
+    def _handle_group_message(self, sock, sender_ip, payload):
+        ## send message to all clients within group
+        ## @todo if the ack gets lost does that mean client sends duplicate messages?
+        metadata = payload.get("metadata", {})
+        sender_name = metadata.get("name", "")
+        client_port = metadata.get("client_port")
+        message = payload.get("payload", {}).get("message", "")
+        ## Send ack to sender
+        message_ack = self.encode_message(MT.GROUP_MESSAGE_ACK)
+        sock.sendto(message_ack, (sender_ip, client_port))
+        logger.info("Client %s sent group message: %s", sender_name, message)
+        ## Dispatch message
+        group = payload.get("payload", {}).get("group", "")
+
+        # reset the group acks that we wait for in thread
+        with self.outbound_group_ack_cv:
+            self.outbound_group_acks[group] = set()
+
+        self.dispatch_group_message(sock, sender_name, group, message)
+
+        self._ack_exec.submit(self.wait_for_group_acks, sender_name, group, sock)
+
+    def _handle_group_message_ack(self, sock, sender_ip, payload):
+        group = payload.get("payload", {}).get("group", "")
+        metadata = payload.get("metadata", {})
+        sender_name = metadata.get("name", "")
+        logger.info("Client %s acked group message", sender_name)
+        with self.outbound_group_ack_cv:
+            self.outbound_group_acks[group].add(sender_name)
+            # wake wait_for_group_acks to re-check its predicate
+            self.outbound_group_ack_cv.notify_all()
+
+    def _handle_list_members(self, sock, sender_ip, payload):
+        group = payload.get("payload", {}).get("group", "")
+        client_name = payload.get("metadata", {}).get("name", "")
+        # get list of users in group
+        group_members = self.groups[group]
+        metadata = payload.get("metadata", {})
+        message_ack = self.encode_message(
+            MT.MEMBERS_LIST, {"members": group_members}
+        )
+        logger.info(
+            "Client %s requested listing members of group %s", client_name, group
+        )
+        for members in group_members:
+            logger.info(members)
+        client_port = metadata.get("client_port")
+        sock.sendto(message_ack, (sender_ip, client_port))
+
+    def _handle_leave_group(self, sock, sender_ip, payload):
+        group = payload.get("payload", {}).get("group", "")
+        metadata = payload.get("metadata", {})
+        sender_name = metadata.get("name", "")
+        # remove user from list in group
+        self.groups[group].remove(sender_name)
+        message_ack = self.encode_message(MT.LEAVE_GROUP_ACK)
+        client_port = metadata.get("client_port")
+        sock.sendto(message_ack, (sender_ip, client_port))
+        logger.info("Client %s left group %s", sender_name, group)
+
+    def _handle_unknown(self, sock, sender_ip, payload):
+        print("got another request: ", sender_ip, payload)
+
+    # One dict lookup on the type code per packet instead of walking the old
+    # 11-branch if/elif chain (same shape as the client's _DISPATCH)
+    _DISPATCH = {
+        MT.REGISTRATION: _handle_registration,
+        MT.DEREGISTRATION: _handle_deregistration,
+        MT.CREATE_GROUP: _handle_create_group,
+        MT.LIST_GROUPS: _handle_list_groups,
+        MT.JOIN_GROUP: _handle_join_group,
+        MT.CLIENT_OFFLINE: _handle_client_offline,
+        MT.GROUP_MESSAGE: _handle_group_message,
+        MT.GROUP_MESSAGE_ACK: _handle_group_message_ack,
+        MT.LIST_MEMBERS: _handle_list_members,
+        MT.LEAVE_GROUP: _handle_leave_group,
+    }
+
+    def handle_request(self, sock, sender_ip, payload):
+        """Handles different request types (e.g. registration)."""
+        handler = self._DISPATCH.get(payload.get("type"), Server._handle_unknown)
+        handler(self, sock, sender_ip, payload)
+
+    def _process(self, sock, data, sender_ip):
+        """Decodes & handles one datagram on a worker thread."""
+        message = self.decode_message(data)
+        with self._state_lock:
+            self.handle_request(sock, sender_ip, message)
 
     def listen(self):
         """Listens on specified `port` opt for messages from downstream clients."""
         sock = self.create_sock()
         sock.bind(("", self.opts["port"]))
 
-        logger.warning(f"Server started on {self.opts['port']}")
+        # select() on a single fd just added two syscalls per packet; block
+        # straight in recvfrom, with a timeout to keep the 1Hz wakeup for
+        # signal delivery
+        sock.settimeout(1.0)
+        # After the blocking receive pulls the first packet of a burst, one
+        # recvmmsg syscall drains up to RECV_BATCH more into a reused pool
+        batch = RecvBatch() if RecvBatch.available() else None
+        # one reusable buffer for the blocking receive as well, so no path
+        # allocates a fresh bytes object per datagram (the drain pool above
+        # covers the batched path)
+        recv_buf = bytearray(4096)
+        recv_view = memoryview(recv_buf)
+        Thread(target=self._state_flusher, daemon=True).start()
+
+        logger.warning("Server started on %s", self.opts["port"])
         while True:
             try:
-                readables, writables, errors = select.select([sock], [], [], 1)
-                for read_socket in readables:
-                    data, (sender_ip, sender_port) = read_socket.recvfrom(4096)
-                    message = self.decode_message(data)
-                    self.handle_request(read_socket, sender_ip, message)
+                nbytes, (sender_ip, sender_port) = sock.recvfrom_into(recv_buf)
+            except socket.timeout:
+                continue
             except socket.error as e:
                 raise ServerError(f"UDP server error when parsing message: {e}")
+            # copy out of the reused buffers before handing off — the pools
+            # get overwritten by the next receive
+            self._work.submit(self._process, sock, bytes(recv_view[:nbytes]), sender_ip)
+            if batch is not None:
+                for data, (sender_ip, sender_port) in batch.drain(sock):
+                    self._work.submit(self._process, sock, bytes(data), sender_ip)
@@ -0,0 +1,44 @@
+import os
+
+## Wire codec shared by client & server — both sides import dumps/loads from
+## here so the serialization format can never drift between the two.
+##
+## JSON is the default format; orjson (when installed) accelerates it without
+## changing the bytes. msgpack encodes ~30% smaller and parses faster, but is
+## opt-in via CHATAPP_WIRE=msgpack: silently switching formats based on which
+## package happens to be installed would break peers on other machines.
+
+# True when the encoded bytes are JSON (lets callers keep JSON-only tricks
+# like splicing pre-encoded fragments together)
+JSON_WIRE = True
+
+if os.environ.get("CHATAPP_WIRE") == "msgpack":
+    try:
+        import msgpack
+
+        def dumps(obj):
+            return msgpack.packb(obj, use_bin_type=True)
+
+        def loads(data):
+            return msgpack.unpackb(data, raw=False)
+
+        JSON_WIRE = False
+    except ImportError:
+        pass  # fall through to the JSON codec below
+
+if JSON_WIRE:
+    try:
+        # orjson returns bytes natively and parses bytes directly, which
+        # skips the str<->bytes copies stdlib json forces on every packet.
+        from orjson import dumps, loads
+    except ImportError:
+        import json
+
+        def dumps(obj):
+            return json.dumps(obj).encode("utf-8")
+
+        def loads(data):
+            # stdlib json can't take a memoryview (orjson/msgpack can)
+            if isinstance(data, memoryview):
+                data = bytes(data)
+            return json.loads(data)